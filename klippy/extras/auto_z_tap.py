@@ -5,9 +5,16 @@
 #
 # This file may be distributed under the terms of the GNU GPLv3 license.
 
+import sys
+import types
 import logging
 import math
+import json
+import functools
+import itertools
 import collections
+import configparser
+import operator
 from . import manual_probe
 from . import probe as probe_module
 
@@ -19,6 +26,25 @@ except AttributeError:
     ProbeResult = collections.namedtuple('probe_result', [
         'bed_x', 'bed_y', 'bed_z', 'test_x', 'test_y', 'test_z'])
 
+# Per-command environment. The first four fields share their index with the
+# merged (bed, hotend, chamber, first_layer) reference tuple.
+ProbeEnv = collections.namedtuple('ProbeEnv', [
+    'bed_temp', 'hotend_temp', 'chamber_temp', 'first_layer_height',
+    'material', 'build_surface', 'nozzle'])
+
+try:
+    from statistics import fmean
+except ImportError:
+    # Python < 3.8
+    def fmean(values):
+        values = list(values)
+        return math.fsum(values) / len(values)
+
+# Cache marker for lookups that may legitimately resolve to None
+_MISSING = object()
+
+_TRUE_STRS = frozenset(('1', 'true', 'yes', 'on'))
+
 
 # ---------------------------------------------------------------------------
 # Utility helpers
@@ -27,19 +53,85 @@ except AttributeError:
 def _normalize_token(value):
     if value is None:
         return ""
-    return str(value).strip().lower()
+    if not isinstance(value, str):
+        value = str(value)
+    value = value.strip()
+    if not value:
+        return ""
+    # Interned so profile filters, probe types and gcode tokens compare by
+    # identity in CPython's string equality fast path.
+    return sys.intern(value.lower())
 
 
 def _split_csv(value):
+    """Split a config/gcode CSV string into normalized non-empty tokens."""
     if not value:
         return []
-    return [_normalize_token(v) for v in str(value).split(',') if v.strip()]
+    if not isinstance(value, str):
+        value = str(value)
+    return [t for t in (v.strip().lower() for v in value.split(',')) if t]
 
 
 def _parse_float_list(value):
     if not value:
         return []
-    return [float(v.strip()) for v in str(value).split(',') if v.strip()]
+    if not isinstance(value, str):
+        value = str(value)
+    # float() already ignores surrounding whitespace
+    return [float(v) for v in value.split(',') if v.strip()]
+
+
+def _fmt_save(key, value):
+    """Build a SAVE_VARIABLE command line for a Python value."""
+    # Extended gcode parsing uses shlex and strips outer quotes, so keep the
+    # full Python literal in one VALUE token by wrapping in double quotes and
+    # escaping internal backslashes/double-quotes.
+    literal = repr(value).replace('\\', '\\\\').replace('"', '\\"')
+    return 'SAVE_VARIABLE VARIABLE=%s VALUE="%s"' % (key, literal)
+
+
+def _write_save_variables(save_obj, updates):
+    """Merge updates into a [save_variables] store with one file write.
+
+    Uses the same file layout as save_variables' SAVE_VARIABLE handler.
+    Returns False if the object doesn't expose the expected attributes, in
+    which case callers should fall back to the SAVE_VARIABLE gcode path.
+    """
+    filename = getattr(save_obj, 'filename', None)
+    current = getattr(save_obj, 'allVariables', None)
+    if not filename or not isinstance(current, dict):
+        return False
+    newvars = dict(current)
+    newvars.update(updates)
+    varfile = configparser.ConfigParser()
+    varfile.add_section('Variables')
+    for name, val in sorted(newvars.items()):
+        varfile.set('Variables', name, repr(val))
+    with open(filename, 'w') as f:
+        varfile.write(f)
+    save_obj.allVariables = newvars
+    return True
+
+
+# Suffixes of the per-printer state stored in [save_variables]
+_VARIABLE_SUFFIXES = (
+    'calibrated', 'reference_probe_z', 'paper_delta', 'reference_x',
+    'reference_y', 'cal_bed_temp', 'cal_hotend_temp', 'cal_chamber_temp',
+    'cal_probe_type', 'last_probe_z', 'last_probe_spread', 'last_offset',
+    'last_drift')
+
+# Maps every ASCII character that isn't alphanumeric or '_' to '_'
+_PREFIX_TABLE = {c: '_' for c in range(128)
+                 if not (chr(c).isalnum() or chr(c) == '_')}
+
+
+def _sanitize_prefix(value):
+    if value.isascii():
+        clean = value.translate(_PREFIX_TABLE)
+    else:
+        clean = ''.join(ch if ch.isalnum() or ch == '_' else '_'
+                        for ch in value)
+    return clean.strip('_')
 
 
 # ---------------------------------------------------------------------------
@@ -153,14 +245,18 @@ class ProbePreset:
             'safe_offset_max': 0.500,
         },
     }
+    # Presets are read-only; store them as namespaces for attribute access
+    PRESETS = {name: types.SimpleNamespace(**values)
+               for name, values in PRESETS.items()}
+
+    __slots__ = ('probe_type', 'values')
 
     def __init__(self, probe_type):
         self.probe_type = probe_type
-        self.values = dict(self.PRESETS.get(probe_type,
-                                            self.PRESETS['generic']))
+        self.values = self.PRESETS.get(probe_type, self.PRESETS['generic'])
 
     def get(self, key, fallback=None):
-        return self.values.get(key, fallback)
+        return getattr(self.values, key, fallback)
 
     @classmethod
     def known_types(cls):
@@ -178,10 +274,13 @@ class ThermalStabilizer:
     inductive probes (trigger distance is temperature-dependent).
     """
 
+    __slots__ = ('printer', 'reactor', 'gcode', '_sensor_cache')
+
     def __init__(self, printer, reactor, gcode):
         self.printer = printer
         self.reactor = reactor
         self.gcode = gcode
+        self._sensor_cache = {}
 
     def wait_for_thermal_stability(self, sensor_names, threshold_per_min,
                                     timeout_sec, check_interval=2.0):
@@ -191,7 +290,7 @@ class ThermalStabilizer:
         last_report = start_time
 
         for name in sensor_names:
-            temp = self._read_sensor_temp(name)
+            temp = self._read_sensor_temp(name, start_time)
             if temp is not None:
                 prev_temps[name] = temp
 
@@ -205,37 +304,43 @@ class ThermalStabilizer:
             "(threshold %.2fC/min, timeout %.0fs)..."
             % (threshold_per_min, timeout_sec))
 
+        # Sensor order is fixed for the whole soak; sort once for reports
+        sensors = sorted(prev_temps)
+        # Never sleep more than one check_interval past the timeout
+        deadline = start_time + timeout_sec + check_interval
+        interval = check_interval
+        now = start_time
         while True:
-            self.reactor.pause(self.reactor.monotonic() + check_interval)
-            now = self.reactor.monotonic()
+            # pause() returns the wake time, so no separate clock read
+            now = self.reactor.pause(min(now + interval, deadline))
             elapsed = now - start_time
 
             if elapsed > timeout_sec:
                 return False
 
+            minutes = (now - prev_time) / 60.0
             current_temps = {}
+            rates = []
             all_stable = True
-            for name in prev_temps:
-                temp = self._read_sensor_temp(name)
+            max_rate = 0.
+            for name in sensors:
+                prev = prev_temps.get(name)
+                if prev is None:
+                    continue
+                temp = self._read_sensor_temp(name, now)
                 if temp is None:
                     continue
                 current_temps[name] = temp
-                minutes = (now - prev_time) / 60.0
+                rate = 0.
                 if minutes > 0.01:
-                    rate = abs(temp - prev_temps[name]) / minutes
+                    rate = abs(temp - prev) / minutes
                     if rate > threshold_per_min:
                         all_stable = False
+                    max_rate = max(max_rate, rate)
+                rates.append((name, temp, rate))
 
             if now - last_report >= 30.0:
-                parts = []
-                for name in sorted(current_temps):
-                    minutes = (now - prev_time) / 60.0
-                    rate = 0.
-                    if minutes > 0.01 and name in prev_temps:
-                        rate = abs(current_temps[name]
-                                   - prev_temps[name]) / minutes
-                    parts.append("%s: %.1fC (%.2fC/min)"
-                                 % (name, current_temps[name], rate))
+                parts = ["%s: %.1fC (%.2fC/min)" % r for r in rates]
                 self.gcode.respond_info(
                     "AUTO_Z_TAP: Thermal soak %.0fs/%.0fs - %s"
                     % (elapsed, timeout_sec, ', '.join(parts)))
@@ -247,15 +352,27 @@ class ThermalStabilizer:
                     % (elapsed,))
                 return True
 
+            # Poll less often while temperatures are still far from
+            # settling; return to the base interval as they approach it.
+            if max_rate > threshold_per_min * 4.:
+                interval = check_interval * 4.
+            elif max_rate > threshold_per_min * 2.:
+                interval = check_interval * 2.
+            else:
+                interval = check_interval
+
             prev_temps = dict(current_temps)
             prev_time = now
 
-    def _read_sensor_temp(self, sensor_name):
-        obj = self.printer.lookup_object(sensor_name, None)
+    def _read_sensor_temp(self, sensor_name, eventtime):
+        obj = self._sensor_cache.get(sensor_name, _MISSING)
+        if obj is _MISSING:
+            obj = self.printer.lookup_object(sensor_name, None)
+            self._sensor_cache[sensor_name] = obj
         if obj is None:
             return None
         try:
-            status = obj.get_status(self.reactor.monotonic())
+            status = obj.get_status(eventtime)
             return status.get('temperature')
         except Exception:
             return None
@@ -272,24 +389,42 @@ class ProbeHealthTracker:
     provides a confidence score, and can suggest adaptive sample counts.
     """
 
+    __slots__ = ('printer', 'reactor', 'gcode', 'variable_prefix', 'history',
+                 '_stats_cache', '_save_obj', '_dirty', '_flush_timer')
+
     MAX_HISTORY = 50
+    # Coalesce history writes; a print start records one session, so there
+    # is no need to rewrite the variables file immediately.
+    SAVE_DELAY = 5.
 
     def __init__(self, printer, gcode, variable_prefix):
         self.printer = printer
+        self.reactor = printer.get_reactor()
         self.gcode = gcode
         self.variable_prefix = variable_prefix
-        self.history = []
+        self.history = collections.deque(maxlen=self.MAX_HISTORY)
+        # Statistics only change when history does; cached until then
+        self._stats_cache = None
+        self._save_obj = None
+        self._dirty = False
+        self._flush_timer = self.reactor.register_timer(self._flush_event)
+        self.printer.register_event_handler(
+            'klippy:disconnect', self.flush)
+
+    def _history_key(self):
+        return '%s_probe_history' % (self.variable_prefix,)
 
     def load(self):
-        save_obj = self.printer.lookup_object('save_variables', None)
-        if save_obj is None:
+        self._save_obj = self.printer.lookup_object('save_variables', None)
+        if self._save_obj is None:
             return
         try:
-            variables = save_obj.get_status(0.).get('variables', {})
-            key = '%s_probe_history' % (self.variable_prefix,)
-            stored = variables.get(key)
-            if stored and isinstance(stored, list):
-                self.history = stored[-self.MAX_HISTORY:]
+            variables = self._save_obj.get_status(0.).get('variables', {})
+            stored = self._decode_history(variables.get(self._history_key()))
+            if stored:
+                self.history.clear()
+                self.history.extend(stored[-self.MAX_HISTORY:])
+                self._stats_cache = None
         except Exception:
             pass
 
@@ -307,27 +442,46 @@ class ProbeHealthTracker:
         if hotend_temp is not None:
             entry['ht'] = round(float(hotend_temp), 1)
         self.history.append(entry)
-        if len(self.history) > self.MAX_HISTORY:
-            self.history = self.history[-self.MAX_HISTORY:]
-        self._save()
+        self._stats_cache = None
+        self._mark_dirty()
 
     def get_statistics(self):
         if not self.history:
             return None
-        spreads = [h['s'] for h in self.history]
-        drifts = [h['d'] for h in self.history]
-        retries = [h['r'] for h in self.history]
-        return {
-            'session_count': len(self.history),
-            'avg_spread': sum(spreads) / len(spreads),
-            'max_spread': max(spreads),
-            'min_spread': min(spreads),
-            'avg_drift': sum(drifts) / len(drifts),
-            'max_abs_drift': max(abs(d) for d in drifts),
-            'avg_retries': sum(retries) / len(retries),
-            'retry_rate': sum(1 for r in retries if r > 0) / len(retries),
+        if self._stats_cache is not None:
+            return self._stats_cache
+        # Single pass over the history for every aggregate
+        spreads = []
+        min_spread = max_spread = self.history[0]['s']
+        sum_drift = max_abs_drift = 0.
+        sum_retries = retried = 0
+        for h in self.history:
+            spread = h['s']
+            spreads.append(spread)
+            if spread < min_spread:
+                min_spread = spread
+            elif spread > max_spread:
+                max_spread = spread
+            drift = h['d']
+            sum_drift += drift
+            if abs(drift) > max_abs_drift:
+                max_abs_drift = abs(drift)
+            sum_retries += h['r']
+            if h['r'] > 0:
+                retried += 1
+        count = len(self.history)
+        self._stats_cache = {
+            'session_count': count,
+            'avg_spread': fmean(spreads),
+            'max_spread': max_spread,
+            'min_spread': min_spread,
+            'avg_drift': sum_drift / count,
+            'max_abs_drift': max_abs_drift,
+            'avg_retries': sum_retries / count,
+            'retry_rate': retried / count,
             'recent_trend': self._compute_trend(spreads),
         }
+        return self._stats_cache
 
     def get_confidence(self):
         stats = self.get_statistics()
@@ -364,8 +518,9 @@ class ProbeHealthTracker:
             warnings.append(
                 "Over 50%% of recent probe sessions required retries. "
                 "Check probe repeatability.")
-        last_5 = self.history[-5:] if len(self.history) >= 5 else self.history
-        if last_5 and max(h['s'] for h in last_5) > 0.040:
+        last_5 = itertools.islice(
+            self.history, max(0, len(self.history) - 5), None)
+        if max(h['s'] for h in last_5) > 0.040:
             warnings.append(
                 "Recent probe spread exceeded 0.040mm. "
                 "Probe may need maintenance.")
@@ -380,32 +535,63 @@ class ProbeHealthTracker:
         return default_samples
 
     def clear(self):
-        self.history = []
-        self._save()
+        self.history.clear()
+        self._stats_cache = None
+        self._mark_dirty()
 
     def _compute_trend(self, values):
         if len(values) < 10:
             return 'insufficient_data'
         half = len(values) // 2
-        recent_avg = sum(values[half:]) / len(values[half:])
-        older_avg = sum(values[:half]) / half
+        recent_avg = fmean(values[half:])
+        older_avg = fmean(values[:half])
         if older_avg > 0 and recent_avg > older_avg * 1.3:
             return 'degrading'
         elif older_avg > 0 and recent_avg < older_avg * 0.7:
             return 'improving'
         return 'stable'
 
-    def _save(self):
-        save_obj = self.printer.lookup_object('save_variables', None)
-        if save_obj is None:
+    @staticmethod
+    def _encode_history(history):
+        # Compact JSON: short keys, no whitespace, parsed at C speed on load
+        return json.dumps(list(history), separators=(',', ':'))
+
+    @staticmethod
+    def _decode_history(stored):
+        # JSON string from current versions, or the list literal that older
+        # versions stored through SAVE_VARIABLE
+        if isinstance(stored, str) and stored.startswith('['):
+            stored = json.loads(stored)
+        if isinstance(stored, list):
+            return stored
+        return None
+
+    def _mark_dirty(self):
+        if not self._dirty:
+            self._dirty = True
+            self.reactor.update_timer(
+                self._flush_timer, self.reactor.monotonic() + self.SAVE_DELAY)
+
+    def _flush_event(self, eventtime):
+        self.flush()
+        return self.reactor.NEVER
+
+    def flush(self):
+        if not self._dirty:
             return
-        key = '%s_probe_history' % (self.variable_prefix,)
+        self._dirty = False
+        self.reactor.update_timer(self._flush_timer, self.reactor.NEVER)
+        if self._save_obj is None:
+            return
+        key = self._history_key()
+        encoded = self._encode_history(self.history)
         try:
-            self.gcode.run_script_from_command(
-                'SAVE_VARIABLE VARIABLE=%s VALUE="%s"'
-                % (key, repr(self.history)))
+            if not _write_save_variables(self._save_obj, {key: encoded}):
+                # Runs from the flush timer or disconnect, outside any
+                # command, so take the gcode mutex
+                self.gcode.run_script(_fmt_save(key, encoded))
         except Exception:
-            pass
+            logging.exception("AUTO_Z_TAP: unable to save probe history")
 
 
 # ---------------------------------------------------------------------------
@@ -413,6 +599,14 @@ class ProbeHealthTracker:
 # ---------------------------------------------------------------------------
 
 class AdjustmentProfile:
+    __slots__ = (
+        'name', 'priority', 'enabled', 'material', 'build_surface', 'nozzle',
+        'probe_type_filter', 'offset', 'bed_temp_coeff', 'hotend_temp_coeff',
+        'chamber_temp_coeff', 'first_layer_coeff', 'bed_temp_poly',
+        'hotend_temp_poly', 'chamber_temp_poly', 'bed_temp_reference',
+        'hotend_temp_reference', 'chamber_temp_reference',
+        'first_layer_reference', '_active_terms')
+
     def __init__(self, config):
         section_name = config.get_name().split(' ', 1)
         if len(section_name) != 2 or not section_name[1].strip():
@@ -454,6 +648,34 @@ class AdjustmentProfile:
         self.first_layer_reference = config.getfloat(
             'first_layer_reference', None)
 
+        # Coefficients are fixed after load, so keep only the terms this
+        # profile uses: (detail name, reference, index into ProbeEnv and
+        # the merged refs, fn(value, ref), note format taking (value, ref))
+        terms = []
+        for label, poly, coeff, ref, idx in (
+                ('bed', self.bed_temp_poly, self.bed_temp_coeff,
+                 self.bed_temp_reference, 0),
+                ('hotend', self.hotend_temp_poly, self.hotend_temp_coeff,
+                 self.hotend_temp_reference, 1),
+                ('chamber', self.chamber_temp_poly, self.chamber_temp_coeff,
+                 self.chamber_temp_reference, 2)):
+            name = label + '_temp'
+            if poly:
+                terms.append((
+                    name + '_poly', ref, idx, _make_poly_fn(poly),
+                    "poly(%s) T=%%.2f ref=%%.2f" % (_format_poly(poly),)))
+            elif coeff:
+                terms.append((
+                    name, ref, idx, _make_linear_fn(coeff),
+                    "(%s %%.2f - ref %%.2f) * %.6f" % (label, coeff)))
+        if self.first_layer_coeff:
+            terms.append((
+                'first_layer', self.first_layer_reference, 3,
+                _make_linear_fn(self.first_layer_coeff),
+                "(layer %%.3f - ref %%.3f) * %.6f"
+                % (self.first_layer_coeff,)))
+        self._active_terms = tuple(terms)
+
     def matches(self, material, build_surface, nozzle, probe_type=''):
         if self.probe_type_filter and self.probe_type_filter != probe_type:
             return False
@@ -465,117 +687,87 @@ class AdjustmentProfile:
             return False
         return True
 
-    def calculate(self, env, calibration_refs, global_refs):
+    def calculate(self, env, refs, collect_details=True):
+        """Return (total, details) for this profile.
+
+        refs is the merged (bed, hotend, chamber, first_layer) reference
+        tuple from AutoZTap, used where the profile sets no reference.
+        """
         total = self.offset
         details = []
-        if self.offset:
+        if collect_details and self.offset:
             details.append(("offset", self.offset))
 
-        bed_temp = env.get('bed_temp')
-        hotend_temp = env.get('hotend_temp')
-        chamber_temp = env.get('chamber_temp')
-        first_layer_height = env.get('first_layer_height')
-
-        bed_ref = self.bed_temp_reference
-        if bed_ref is None:
-            bed_ref = global_refs.get('bed_temp_reference')
-        if bed_ref is None:
-            bed_ref = calibration_refs.get('bed_temp_reference')
-
-        hotend_ref = self.hotend_temp_reference
-        if hotend_ref is None:
-            hotend_ref = global_refs.get('hotend_temp_reference')
-        if hotend_ref is None:
-            hotend_ref = calibration_refs.get('hotend_temp_reference')
-
-        chamber_ref = self.chamber_temp_reference
-        if chamber_ref is None:
-            chamber_ref = global_refs.get('chamber_temp_reference')
-        if chamber_ref is None:
-            chamber_ref = calibration_refs.get('chamber_temp_reference')
-
-        first_layer_ref = self.first_layer_reference
-        if first_layer_ref is None:
-            first_layer_ref = global_refs.get('first_layer_reference')
-
-        # Bed temperature compensation
-        if bed_temp is not None and bed_ref is not None:
-            if self.bed_temp_poly:
-                val = _compute_poly(self.bed_temp_poly, bed_temp, bed_ref)
-                total += val
-                details.append((
-                    "bed_temp_poly", val,
-                    "poly(%s) T=%.2f ref=%.2f" % (
-                        ','.join('%.8f' % c for c in self.bed_temp_poly),
-                        bed_temp, bed_ref)))
-            elif self.bed_temp_coeff:
-                val = (bed_temp - bed_ref) * self.bed_temp_coeff
-                total += val
-                details.append((
-                    "bed_temp", val,
-                    "(bed %.2f - ref %.2f) * %.6f" % (
-                        bed_temp, bed_ref, self.bed_temp_coeff)))
-
-        # Hotend temperature compensation
-        if hotend_temp is not None and hotend_ref is not None:
-            if self.hotend_temp_poly:
-                val = _compute_poly(
-                    self.hotend_temp_poly, hotend_temp, hotend_ref)
-                total += val
-                details.append((
-                    "hotend_temp_poly", val,
-                    "poly(%s) T=%.2f ref=%.2f" % (
-                        ','.join('%.8f' % c for c in self.hotend_temp_poly),
-                        hotend_temp, hotend_ref)))
-            elif self.hotend_temp_coeff:
-                val = (hotend_temp - hotend_ref) * self.hotend_temp_coeff
-                total += val
-                details.append((
-                    "hotend_temp", val,
-                    "(hotend %.2f - ref %.2f) * %.6f" % (
-                        hotend_temp, hotend_ref, self.hotend_temp_coeff)))
-
-        # Chamber temperature compensation
-        if chamber_temp is not None and chamber_ref is not None:
-            if self.chamber_temp_poly:
-                val = _compute_poly(
-                    self.chamber_temp_poly, chamber_temp, chamber_ref)
-                total += val
-                details.append((
-                    "chamber_temp_poly", val,
-                    "poly(%s) T=%.2f ref=%.2f" % (
-                        ','.join('%.8f' % c for c in self.chamber_temp_poly),
-                        chamber_temp, chamber_ref)))
-            elif self.chamber_temp_coeff:
-                val = (chamber_temp - chamber_ref) * self.chamber_temp_coeff
-                total += val
-                details.append((
-                    "chamber_temp", val,
-                    "(chamber %.2f - ref %.2f) * %.6f" % (
-                        chamber_temp, chamber_ref, self.chamber_temp_coeff)))
-
-        # First layer height compensation
-        if (self.first_layer_coeff and first_layer_height is not None
-                and first_layer_ref is not None):
-            val = ((first_layer_height - first_layer_ref)
-                   * self.first_layer_coeff)
+        for name, ref, idx, fn, note in self._active_terms:
+            value = env[idx]
+            if value is None:
+                continue
+            if ref is None:
+                ref = refs[idx]
+                if ref is None:
+                    continue
+            val = fn(value, ref)
             total += val
-            details.append((
-                "first_layer", val,
-                "(layer %.3f - ref %.3f) * %.6f" % (
-                    first_layer_height, first_layer_ref,
-                    self.first_layer_coeff)))
+            if collect_details:
+                details.append((name, val, note % (value, ref)))
 
         return total, details
 
 
-def _compute_poly(coeffs, temp, ref):
-    """Evaluate polynomial: c1*(T-Tref) + c2*(T-Tref)^2 + ..."""
-    delta = temp - ref
-    total = 0.
-    for i, c in enumerate(coeffs):
-        total += c * (delta ** (i + 1))
-    return total
+def _sample_stats(values):
+    """Return (average, median, spread, population stdev) of values."""
+    ordered = sorted(values)
+    count = len(ordered)
+    # Welford's running mean/variance; min and max come from the sort
+    mean = m2 = 0.
+    for n, v in enumerate(ordered, 1):
+        delta = v - mean
+        mean += delta / n
+        m2 += delta * (v - mean)
+    return (mean, ordered[count // 2], ordered[-1] - ordered[0],
+            math.sqrt(m2 / count))
+
+
+_bed_z = operator.attrgetter('bed_z')
+
+
+def _average_probe_results(results):
+    # Same as probe.calc_probe_z_average(results, 'average'), without the
+    # per-field list building
+    count = float(len(results))
+    return ProbeResult(*[sum(field) / count for field in zip(*results)])
+
+
+def _format_poly(coeffs):
+    return ','.join('%.8f' % c for c in coeffs)
+
+
+def _make_linear_fn(coeff):
+    """Return f(value, ref) = (value - ref) * coeff."""
+    def linear(value, ref):
+        return (value - ref) * coeff
+    return linear
+
+
+def _make_poly_fn(coeffs):
+    """Return f(temp, ref) = c1*(T-Tref) + c2*(T-Tref)^2 + ...
+
+    Coefficients are fixed at config load, so they are bound into the
+    closure once. Returns None for an empty coefficient list.
+    """
+    if not coeffs:
+        return None
+    # Horner's method over highest order first; the polynomial has no
+    # constant term, so the sum is multiplied by delta once more at the end.
+    rcoeffs = tuple(reversed(coeffs))
+
+    def poly(temp, ref):
+        delta = temp - ref
+        acc = 0.
+        for c in rcoeffs:
+            acc = acc * delta + c
+        return acc * delta
+    return poly
 
 
 # ---------------------------------------------------------------------------
@@ -583,6 +775,17 @@ def _compute_poly(coeffs, temp, ref):
 # ---------------------------------------------------------------------------
 
 class AutoZTap:
+    # Global temperature terms: (label, index into ProbeEnv and
+    # _merged_refs(), poly attr, prebuilt poly function attr, linear coeff
+    # attr)
+    _GLOBAL_TERMS = (
+        ('bed', 0, 'bed_temp_poly', '_bed_poly_fn', 'bed_temp_coeff'),
+        ('hotend', 1,
+         'hotend_temp_poly', '_hotend_poly_fn', 'hotend_temp_coeff'),
+        ('chamber', 2,
+         'chamber_temp_poly', '_chamber_poly_fn', 'chamber_temp_coeff'),
+    )
+
     def __init__(self, config):
         self.printer = config.get_printer()
         self.reactor = self.printer.get_reactor()
@@ -680,6 +883,9 @@ class AutoZTap:
             config.get('hotend_temp_poly', ''))
         self.chamber_temp_poly = _parse_float_list(
             config.get('chamber_temp_poly', ''))
+        self._bed_poly_fn = _make_poly_fn(self.bed_temp_poly)
+        self._hotend_poly_fn = _make_poly_fn(self.hotend_temp_poly)
+        self._chamber_poly_fn = _make_poly_fn(self.chamber_temp_poly)
 
         self.bed_temp_reference = config.getfloat('bed_temp_reference', None)
         self.hotend_temp_reference = config.getfloat(
@@ -691,6 +897,8 @@ class AutoZTap:
 
         self.default_profile = _normalize_token(
             config.get('default_profile', ''))
+        self._default_profile_tokens = tuple(
+            _split_csv(self.default_profile))
         self.chamber_sensor = _normalize_token(
             config.get('chamber_sensor', ''))
         self.max_total_adjustment = config.getfloat(
@@ -720,13 +928,10 @@ class AutoZTap:
         # Variable naming
         raw_prefix = _normalize_token(
             config.get('variable_prefix', 'auto_z_tap'))
-        clean = []
-        for ch in raw_prefix:
-            if ch.isalnum() or ch == '_':
-                clean.append(ch)
-            else:
-                clean.append('_')
-        self.variable_prefix = ''.join(clean).strip('_') or 'auto_z_tap'
+        self.variable_prefix = _sanitize_prefix(raw_prefix) or 'auto_z_tap'
+        self._var_keys = {
+            suffix: '%s_%s' % (self.variable_prefix, suffix)
+            for suffix in _VARIABLE_SUFFIXES}
 
         # Adjustment profiles
         self.adjustments = {}
@@ -737,13 +942,62 @@ class AutoZTap:
                     "Duplicate auto_z_tap adjustment profile: %s"
                     % (profile.name,))
             self.adjustments[profile.name] = profile
+        self._sorted_profile_names = tuple(sorted(self.adjustments))
+        # Auto-match candidates in priority order.  Profiles are fixed after
+        # config load, so filter and sort them once here.
+        self._enabled_profiles = sorted(
+            (p for p in self.adjustments.values() if p.enabled),
+            key=lambda p: (p.priority, p.name))
+        # Index by filter tuple; an empty filter field acts as a wildcard
+        self._profile_index = {}
+        for profile in self._enabled_profiles:
+            key = (profile.material, profile.build_surface, profile.nozzle,
+                   profile.probe_type_filter)
+            self._profile_index.setdefault(key, []).append(profile)
+        self._match_profiles = functools.lru_cache(maxsize=64)(
+            self._lookup_profiles)
+        # Whole PROFILE/PROFILES/AUTO_MATCH + env resolution; unknown names
+        # raise, and lru_cache doesn't cache exceptions
+        self._resolve_profiles_cached = functools.lru_cache(maxsize=64)(
+            self._lookup_requested_profiles)
 
         # Runtime state
         self.probe = None
         self.toolhead = None
-        self.thermal_stabilizer = None
-        self.health_tracker = None
+        self._save_obj = None
+        self._bed_mesh = None
+        # save_variables dict that self.status was last loaded from
+        self._loaded_variables = None
+        self._heater_cache = {}
+        # Eventtime snapshot shared by status queries within one command
+        self._cmd_eventtime = None
+        # Created on first use; see the properties below
+        self._thermal_stabilizer = None
+        self._health_tracker = None
         self.pending_calibration = None
+        self._refs_version = 0
+        self._calibration_refs_key = None
+        self._calibration_refs_cache = None
+        self._merged_refs_version = None
+        self._merged_refs_cache = None
+        # Config-derived get_status() fields never change after load
+        self._static_status = {
+            'probe_type': self.probe_type,
+            'probe_type_description': self.preset.get('description', ''),
+            'thermal_soak_enabled': self.thermal_soak_enabled,
+            'warmup_taps': self.warmup_taps,
+            'safe_offset_min': self.safe_offset_min,
+            'safe_offset_max': self.safe_offset_max,
+        }
+        # Health fields for get_status(), rebuilt when the tracker's
+        # statistics dict is replaced
+        self._health_status_stats = None
+        self._health_status = {}
+        # get_status() snapshot; rebuilt only after self.status is written
+        # (_status_dirty) or the health fields change
+        self._status_snapshot = None
+        self._status_snapshot_health = None
+        self._status_dirty = True
         self.status = {
             'calibrated': False,
             'reference_probe_z': 0.0,
@@ -766,6 +1020,8 @@ class AutoZTap:
 
         self.printer.register_event_handler(
             'klippy:connect', self._handle_connect)
+        self.printer.register_event_handler(
+            'klippy:disconnect', self._handle_disconnect)
 
         self.gcode.register_command(
             'AUTO_Z_TAP', self.cmd_AUTO_Z_TAP,
@@ -797,9 +1053,6 @@ class AutoZTap:
             "Check klippy.log traceback for details."
             % (context, str(exc)))
 
-    def _var_key(self, suffix):
-        return '%s_%s' % (self.variable_prefix, suffix)
-
     def _derive_reference_xy(self, config):
         if (not config.has_section('stepper_x')
                 or not config.has_section('stepper_y')):
@@ -813,82 +1066,113 @@ class AutoZTap:
         return ((xmin + xmax) / 2., (ymin + ymax) / 2.)
 
     def _eventtime(self):
+        if self._cmd_eventtime is not None:
+            return self._cmd_eventtime
         return self.reactor.monotonic()
 
     def _handle_connect(self):
         self.toolhead = self.printer.lookup_object('toolhead')
+        self._save_obj = self.printer.lookup_object('save_variables', None)
+        self._bed_mesh = self.printer.lookup_object('bed_mesh', None)
         self.probe = self.printer.lookup_object(
             self.probe_object_name, None)
-        self.thermal_stabilizer = ThermalStabilizer(
-            self.printer, self.reactor, self.gcode)
-        if self.probe_health_tracking:
-            self.health_tracker = ProbeHealthTracker(
-                self.printer, self.gcode, self.variable_prefix)
-            self.health_tracker.load()
         self._load_persistent_state()
 
+    def _handle_disconnect(self):
+        self._heater_cache.clear()
+
+    @property
+    def thermal_stabilizer(self):
+        if self._thermal_stabilizer is None:
+            self._thermal_stabilizer = ThermalStabilizer(
+                self.printer, self.reactor, self.gcode)
+        return self._thermal_stabilizer
+
+    @property
+    def health_tracker(self):
+        if self._health_tracker is None and self.probe_health_tracking:
+            self._health_tracker = ProbeHealthTracker(
+                self.printer, self.gcode, self.variable_prefix)
+            self._health_tracker.load()
+        return self._health_tracker
+
+    def _get_flag(self, gcmd, params, name, default=0):
+        # Mode flags are normally absent; only parse the ones given, and
+        # let get_int do the validation and error reporting for those.
+        if name not in params:
+            return default
+        return gcmd.get_int(name, default, minval=0, maxval=1)
+
     def _parse_bool(self, value):
-        if isinstance(value, bool):
+        if value is True or value is False:
             return value
+        if isinstance(value, str):
+            return value.strip().lower() in _TRUE_STRS
         if isinstance(value, (float, int)):
             return bool(value)
-        if isinstance(value, str):
-            return value.strip().lower() in ('1', 'true', 'yes', 'on')
         return False
 
     def _read_saved_variables(self):
-        save_obj = self.printer.lookup_object('save_variables', None)
-        if save_obj is None:
+        if self._save_obj is None:
             return {}
         try:
-            return save_obj.get_status(
+            return self._save_obj.get_status(
                 self._eventtime()).get('variables', {})
-        except Exception:
+        except (AttributeError, KeyError, TypeError):
             return {}
 
-    def _save_variable(self, key, value):
-        save_obj = self.printer.lookup_object('save_variables', None)
-        if save_obj is None:
+    def _save_variables_bulk(self, mapping):
+        """Persist several variables with a single save_variables write."""
+        if self._save_obj is None:
             return False
-        literal = repr(value)
-        # Extended gcode parsing uses shlex and strips outer quotes, so keep
-        # the full Python literal in one VALUE token by wrapping in double
-        # quotes and escaping internal backslashes/double-quotes.
-        encoded = literal.replace('\\', '\\\\').replace('"', '\\"')
-        self.gcode.run_script_from_command(
-            'SAVE_VARIABLE VARIABLE=%s VALUE=\"%s\"' % (key, encoded))
+        if not mapping:
+            return True
+        try:
+            if _write_save_variables(self._save_obj, mapping):
+                return True
+        except (IOError, OSError):
+            logging.exception("AUTO_Z_TAP: unable to save variables")
+            raise self.printer.command_error(
+                "AUTO_Z_TAP: unable to save variables")
+        # Unknown save_variables layout; go through SAVE_VARIABLE instead
+        self._run_script_batch(
+            [_fmt_save(key, value) for key, value in mapping.items()])
         return True
 
+    def _run_script_batch(self, lines):
+        # One dispatch through the gcode queue for several commands
+        self.gcode.run_script_from_command('\n'.join(lines))
+
     def _load_persistent_state(self):
-        values = self._read_saved_variables()
-        self.status['calibrated'] = self._parse_bool(
-            values.get(self._var_key('calibrated'), False))
-        self.status['reference_probe_z'] = float(
-            values.get(self._var_key('reference_probe_z'), 0.0))
-        self.status['paper_delta'] = float(
-            values.get(self._var_key('paper_delta'), 0.0))
-        self.status['reference_x'] = float(values.get(
-            self._var_key('reference_x'),
-            self.reference_xy[0] if self.reference_xy else 0.0))
-        self.status['reference_y'] = float(values.get(
-            self._var_key('reference_y'),
-            self.reference_xy[1] if self.reference_xy else 0.0))
-        self.status['calibration_bed_temp'] = values.get(
-            self._var_key('cal_bed_temp'), None)
-        self.status['calibration_hotend_temp'] = values.get(
-            self._var_key('cal_hotend_temp'), None)
-        self.status['calibration_chamber_temp'] = values.get(
-            self._var_key('cal_chamber_temp'), None)
-        self.status['calibration_probe_type'] = values.get(
-            self._var_key('cal_probe_type'), None)
-        self.status['last_probe_z'] = values.get(
-            self._var_key('last_probe_z'), None)
-        self.status['last_probe_spread'] = values.get(
-            self._var_key('last_probe_spread'), None)
-        self.status['last_offset'] = values.get(
-            self._var_key('last_offset'), None)
-        self.status['last_drift'] = values.get(
-            self._var_key('last_drift'), None)
+        variables = self._read_saved_variables()
+        # save_variables swaps in a new dict on every write, so the same
+        # object means nothing was stored since the last load.  Anything
+        # that writes self.status without saving resets _loaded_variables
+        # so the stored values are reloaded over it.
+        if variables is self._loaded_variables:
+            return
+        self._loaded_variables = variables
+        get = variables.get
+        vk = self._var_keys
+        st = self.status
+        if self.reference_xy:
+            rx_default, ry_default = self.reference_xy
+        else:
+            rx_default = ry_default = 0.0
+        st['calibrated'] = self._parse_bool(get(vk['calibrated'], False))
+        st['reference_probe_z'] = float(get(vk['reference_probe_z'], 0.0))
+        st['paper_delta'] = float(get(vk['paper_delta'], 0.0))
+        st['reference_x'] = float(get(vk['reference_x'], rx_default))
+        st['reference_y'] = float(get(vk['reference_y'], ry_default))
+        st['calibration_bed_temp'] = get(vk['cal_bed_temp'], None)
+        st['calibration_hotend_temp'] = get(vk['cal_hotend_temp'], None)
+        st['calibration_chamber_temp'] = get(vk['cal_chamber_temp'], None)
+        st['calibration_probe_type'] = get(vk['cal_probe_type'], None)
+        st['last_probe_z'] = get(vk['last_probe_z'], None)
+        st['last_probe_spread'] = get(vk['last_probe_spread'], None)
+        st['last_offset'] = get(vk['last_offset'], None)
+        st['last_drift'] = get(vk['last_drift'], None)
+        self._status_dirty = True
 
     # ------------------------------------------------------------------
     # Precondition checks
@@ -905,24 +1189,19 @@ class AutoZTap:
     def _require_save_variables(self, gcmd):
         if not self.require_save_variables:
             return
-        save_obj = self.printer.lookup_object('save_variables', None)
-        if save_obj is None:
+        if self._save_obj is None:
             raise gcmd.error(
                 "[save_variables] is required by AUTO_Z_TAP.\n"
                 "Add the following to printer.cfg and restart Klipper:\n"
                 "  [save_variables]\n"
                 "  filename: ~/printer_data/config/variables.cfg")
 
-    def _axis_is_homed(self, axis):
+    def _ensure_homed(self, gcmd):
         homed = self.toolhead.get_status(
             self._eventtime()).get('homed_axes', '')
         if isinstance(homed, str):
-            return axis in homed.lower()
-        return axis in homed
-
-    def _ensure_homed(self, gcmd):
-        need = ('x', 'y', 'z')
-        if all(self._axis_is_homed(a) for a in need):
+            homed = homed.lower()
+        if 'x' in homed and 'y' in homed and 'z' in homed:
             return
         if not self.auto_home:
             raise gcmd.error(
@@ -950,11 +1229,11 @@ class AutoZTap:
     def _maybe_clear_bed_mesh(self):
         if not self.clear_bed_mesh_before_probe:
             return
-        if self.printer.lookup_object('bed_mesh', None) is None:
+        if self._bed_mesh is None:
             return
         try:
             self.gcode.run_script_from_command('BED_MESH_CLEAR')
-        except Exception:
+        except self.printer.command_error:
             pass
 
     def _manual_move(self, x=None, y=None, z=None, speed=None):
@@ -1075,16 +1354,16 @@ class AutoZTap:
                 "AUTO_Z_TAP: unsupported probe result type '%s' (%r): %s"
                 % (type(raw_result).__name__, raw_result, str(e)))
 
-    def _probe_once(self, gcmd):
+    def _build_probe_params(self, probe_speed, lift_speed, retract):
         params = {'SAMPLES': '1'}
-        probe_speed = self._effective_probe_speed(gcmd)
         if probe_speed is not None:
             params['PROBE_SPEED'] = '%.6f' % (probe_speed,)
-        lift_speed = self._effective_lift_speed(gcmd)
         if lift_speed is not None:
             params['LIFT_SPEED'] = '%.6f' % (lift_speed,)
-        params['SAMPLE_RETRACT_DIST'] = '%.6f' % (
-            self._effective_retract(gcmd),)
+        params['SAMPLE_RETRACT_DIST'] = '%.6f' % (retract,)
+        return params
+
+    def _probe_with_params(self, params):
         probe_gcmd = self.gcode.create_gcode_command(
             'AUTO_Z_TAP_INTERNAL_PROBE',
             'AUTO_Z_TAP_INTERNAL_PROBE', params)
@@ -1095,21 +1374,24 @@ class AutoZTap:
         """Execute throwaway probe taps to settle the probe mechanism."""
         self.gcode.respond_info(
             "AUTO_Z_TAP: Performing %d warm-up tap(s)..." % (count,))
+        probe_speed = self._effective_probe_speed(gcmd)
+        lift_speed = self._effective_lift_speed(gcmd)
+        retract = self._effective_retract(gcmd)
+        params = self._build_probe_params(probe_speed, lift_speed, retract)
         self._move_to_reference(x, y)
         for i in range(count):
-            self._probe_once(gcmd)
+            self._probe_with_params(params)
             cur = self.toolhead.get_position()
-            self._manual_move(
-                z=cur[2] + self._effective_retract(gcmd),
-                speed=self._effective_lift_speed(gcmd))
+            self._manual_move(z=cur[2] + retract, speed=lift_speed)
         self.gcode.respond_info("AUTO_Z_TAP: Warm-up complete")
         self._raise_for_travel()
 
     def _run_guarded_probe(self, gcmd, x, y, effective_samples=None):
+        gi = gcmd.get_int
         samples = effective_samples
         if samples is None:
-            samples = gcmd.get_int('SAMPLES', self.probe_samples, minval=1)
-        retries = gcmd.get_int('RETRIES', self.probe_retries, minval=0)
+            samples = gi('SAMPLES', self.probe_samples, minval=1)
+        retries = gi('RETRIES', self.probe_retries, minval=0)
         spread_limit = gcmd.get_float(
             'MAX_SPREAD', self.max_probe_spread, minval=0.)
         method = _normalize_token(
@@ -1117,23 +1399,40 @@ class AutoZTap:
         if method not in ('average', 'median'):
             raise gcmd.error("SAMPLES_RESULT must be average or median")
 
+        probe_speed = self._effective_probe_speed(gcmd)
+        lift_speed = self._effective_lift_speed(gcmd)
+        retract = self._effective_retract(gcmd)
+        params = self._build_probe_params(probe_speed, lift_speed, retract)
         best = None
         last_spread = None
         for attempt in range(retries + 1):
             self._move_to_reference(x, y)
             samples_raw = []
             for idx in range(samples):
-                pres = self._probe_once(gcmd)
+                pres = self._probe_with_params(params)
                 samples_raw.append(pres)
                 if idx + 1 < samples:
                     cur = self.toolhead.get_position()
-                    self._manual_move(
-                        z=cur[2] + self._effective_retract(gcmd),
-                        speed=self._effective_lift_speed(gcmd))
-            z_values = [p.bed_z for p in samples_raw]
-            spread = max(z_values) - min(z_values)
+                    self._manual_move(z=cur[2] + retract, speed=lift_speed)
+            if method == 'median':
+                # One sort gives both the median and the spread
+                ordered = sorted(samples_raw, key=_bed_z)
+                spread = ordered[-1].bed_z - ordered[0].bed_z
+                mid = samples // 2
+                if samples & 1:
+                    best = ordered[mid]
+                else:
+                    best = _average_probe_results(ordered[mid - 1:mid + 1])
+            else:
+                zmin = zmax = samples_raw[0].bed_z
+                for pres in samples_raw:
+                    if pres.bed_z < zmin:
+                        zmin = pres.bed_z
+                    elif pres.bed_z > zmax:
+                        zmax = pres.bed_z
+                spread = zmax - zmin
+                best = _average_probe_results(samples_raw)
             last_spread = spread
-            best = probe_module.calc_probe_z_average(samples_raw, method)
             if spread_limit <= 0. or spread <= spread_limit:
                 return best, spread, attempt, samples
             self.gcode.respond_info(
@@ -1166,7 +1465,7 @@ class AutoZTap:
             'THERMAL_SOAK',
             1 if self.thermal_soak_enabled else 0,
             minval=0, maxval=1)
-        if not do_soak or self.thermal_stabilizer is None:
+        if not do_soak:
             return
         sensors = self._resolve_soak_sensors()
         if not sensors:
@@ -1188,7 +1487,10 @@ class AutoZTap:
     def _heater_temperature(self, object_name):
         if not object_name:
             return None
-        obj = self.printer.lookup_object(object_name, None)
+        obj = self._heater_cache.get(object_name, _MISSING)
+        if obj is _MISSING:
+            obj = self.printer.lookup_object(object_name, None)
+            self._heater_cache[object_name] = obj
         if obj is None:
             return None
         status = obj.get_status(self._eventtime())
@@ -1220,28 +1522,30 @@ class AutoZTap:
 
         first_layer_height = gcmd.get_float('FIRST_LAYER_HEIGHT', None)
 
-        return {
-            'bed_temp': bed_temp,
-            'hotend_temp': hotend_temp,
-            'chamber_temp': chamber_temp,
-            'first_layer_height': first_layer_height,
-            'material': _normalize_token(gcmd.get('MATERIAL', '')),
-            'build_surface': _normalize_token(gcmd.get('BUILD_SURFACE', '')),
-            'nozzle': _normalize_token(gcmd.get('NOZZLE', '')),
-        }
+        return ProbeEnv(
+            bed_temp, hotend_temp, chamber_temp, first_layer_height,
+            _normalize_token(gcmd.get('MATERIAL', '')),
+            _normalize_token(gcmd.get('BUILD_SURFACE', '')),
+            _normalize_token(gcmd.get('NOZZLE', '')))
 
     # ------------------------------------------------------------------
     # References and profiles
     # ------------------------------------------------------------------
 
     def _calibration_refs(self):
-        return {
-            'bed_temp_reference': self.status.get('calibration_bed_temp'),
-            'hotend_temp_reference': self.status.get(
-                'calibration_hotend_temp'),
-            'chamber_temp_reference': self.status.get(
-                'calibration_chamber_temp'),
-        }
+        key = (self.status.get('calibration_bed_temp'),
+               self.status.get('calibration_hotend_temp'),
+               self.status.get('calibration_chamber_temp'))
+        if key != self._calibration_refs_key:
+            # Invalidates the merged references used by profiles
+            self._calibration_refs_key = key
+            self._calibration_refs_cache = {
+                'bed_temp_reference': key[0],
+                'hotend_temp_reference': key[1],
+                'chamber_temp_reference': key[2],
+            }
+            self._refs_version += 1
+        return self._calibration_refs_cache
 
     def _global_refs(self):
         return {
@@ -1251,44 +1555,66 @@ class AutoZTap:
             'first_layer_reference': self.first_layer_reference,
         }
 
+    def _merged_refs(self):
+        # (bed, hotend, chamber, first_layer) profile fallback references;
+        # configured globals take precedence over calibration temperatures
+        calibration_refs = self._calibration_refs()
+        if self._merged_refs_version != self._refs_version:
+            global_refs = self._global_refs()
+            merged = []
+            for key in ('bed_temp_reference', 'hotend_temp_reference',
+                        'chamber_temp_reference', 'first_layer_reference'):
+                ref = global_refs.get(key)
+                if ref is None:
+                    ref = calibration_refs.get(key)
+                merged.append(ref)
+            self._merged_refs_cache = tuple(merged)
+            self._merged_refs_version = self._refs_version
+        return self._merged_refs_cache
+
+    def _lookup_profiles(self, material, build_surface, nozzle, probe_type):
+        # Each field either matches exactly or via a wildcard ('') filter,
+        # so at most 16 index buckets can hold matching profiles.
+        options = [(v, '') if v else ('',)
+                   for v in (material, build_surface, nozzle, probe_type)]
+        found = []
+        for key in itertools.product(*options):
+            found.extend(self._profile_index.get(key, ()))
+        found.sort(key=lambda p: (p.priority, p.name))
+        return tuple(found)
+
     def _resolve_profiles(self, gcmd, env):
-        requested = []
-        requested.extend(_split_csv(gcmd.get('PROFILE', '')))
-        requested.extend(_split_csv(gcmd.get('PROFILES', '')))
+        auto_match = gcmd.get_int('AUTO_MATCH', 1, minval=0, maxval=1)
+        return self._resolve_profiles_cached(
+            gcmd.get('PROFILE', ''), gcmd.get('PROFILES', ''), auto_match,
+            env.material, env.build_surface, env.nozzle)
 
-        if not requested and self.default_profile:
-            requested.extend(_split_csv(self.default_profile))
+    def _lookup_requested_profiles(self, profile_arg, profiles_arg,
+                                   auto_match, material, build_surface,
+                                   nozzle):
+        # Ordered de-duplication: dict keys keep first-seen order
+        requested = dict.fromkeys(itertools.chain(
+            _split_csv(profile_arg), _split_csv(profiles_arg)))
+
+        if not requested:
+            requested = dict.fromkeys(self._default_profile_tokens)
 
-        auto_match = gcmd.get_int('AUTO_MATCH', 1, minval=0, maxval=1)
         if auto_match:
-            matches = [
-                p for p in self.adjustments.values()
-                if p.enabled and p.matches(
-                    env.get('material', ''),
-                    env.get('build_surface', ''),
-                    env.get('nozzle', ''),
-                    self.probe_type)]
-            matches.sort(key=lambda p: (p.priority, p.name))
-            for profile in matches:
-                if profile.name not in requested:
-                    requested.append(profile.name)
+            matches = self._match_profiles(
+                material, build_surface, nozzle, self.probe_type)
+            requested.update(dict.fromkeys(p.name for p in matches))
 
         resolved = []
-        seen = set()
         for name in requested:
-            if not name or name in seen:
-                continue
             profile = self.adjustments.get(name)
             if profile is None:
-                raise gcmd.error(
+                raise self.printer.command_error(
                     "Unknown AUTO_Z_TAP profile: %s\n"
                     "Available profiles: %s"
-                    % (name, ', '.join(sorted(self.adjustments.keys()))))
-            if not profile.enabled:
-                continue
-            resolved.append(profile)
-            seen.add(name)
-        return resolved
+                    % (name, ', '.join(self._sorted_profile_names)))
+            if profile.enabled:
+                resolved.append(profile)
+        return tuple(resolved)
 
     # ------------------------------------------------------------------
     # Adjustment computation
@@ -1297,113 +1623,78 @@ class AutoZTap:
     def _compute_adjustment(self, gcmd, env):
         total = self.global_offset
         details = []
-        if self.global_offset:
+        # Details are only used for the report breakdown; with it disabled
+        # don't build them at all
+        collect_details = self.report_breakdown
+        if collect_details and self.global_offset:
             details.append(("global_offset", self.global_offset, "config"))
 
-        refs = self._calibration_refs()
-
-        # Global bed temp compensation
-        if env['bed_temp'] is not None:
-            bed_ref = self.bed_temp_reference
-            if bed_ref is None:
-                bed_ref = refs.get('bed_temp_reference')
-            if bed_ref is not None:
-                if self.bed_temp_poly:
-                    val = _compute_poly(
-                        self.bed_temp_poly, env['bed_temp'], bed_ref)
-                    total += val
-                    details.append((
-                        "global_bed_temp_poly", val,
-                        "poly T=%.2f ref=%.2f" % (env['bed_temp'], bed_ref)))
-                elif self.bed_temp_coeff:
-                    val = (env['bed_temp'] - bed_ref) * self.bed_temp_coeff
-                    total += val
-                    details.append((
-                        "global_bed_temp", val,
-                        "(bed %.2f - ref %.2f) * %.6f"
-                        % (env['bed_temp'], bed_ref, self.bed_temp_coeff)))
-
-        # Global hotend temp compensation
-        if env['hotend_temp'] is not None:
-            hotend_ref = self.hotend_temp_reference
-            if hotend_ref is None:
-                hotend_ref = refs.get('hotend_temp_reference')
-            if hotend_ref is not None:
-                if self.hotend_temp_poly:
-                    val = _compute_poly(
-                        self.hotend_temp_poly, env['hotend_temp'], hotend_ref)
-                    total += val
-                    details.append((
-                        "global_hotend_temp_poly", val,
-                        "poly T=%.2f ref=%.2f"
-                        % (env['hotend_temp'], hotend_ref)))
-                elif self.hotend_temp_coeff:
-                    val = ((env['hotend_temp'] - hotend_ref)
-                           * self.hotend_temp_coeff)
-                    total += val
-                    details.append((
-                        "global_hotend_temp", val,
-                        "(hotend %.2f - ref %.2f) * %.6f"
-                        % (env['hotend_temp'], hotend_ref,
-                           self.hotend_temp_coeff)))
-
-        # Global chamber temp compensation
-        if env['chamber_temp'] is not None:
-            chamber_ref = self.chamber_temp_reference
-            if chamber_ref is None:
-                chamber_ref = refs.get('chamber_temp_reference')
-            if chamber_ref is not None:
-                if self.chamber_temp_poly:
-                    val = _compute_poly(
-                        self.chamber_temp_poly,
-                        env['chamber_temp'], chamber_ref)
-                    total += val
+        # Configured references, falling back to the calibration temps;
+        # shared with the profiles below
+        merged_refs = self._merged_refs()
+
+        # Global bed/hotend/chamber temp compensation
+        for (label, ref_idx, poly_attr, poly_fn_attr,
+             coeff_attr) in self._GLOBAL_TERMS:
+            temp = env[ref_idx]
+            ref = merged_refs[ref_idx]
+            if temp is None or ref is None:
+                continue
+            if getattr(self, poly_attr):
+                val = getattr(self, poly_fn_attr)(temp, ref)
+                total += val
+                if collect_details:
                     details.append((
-                        "global_chamber_temp_poly", val,
-                        "poly T=%.2f ref=%.2f"
-                        % (env['chamber_temp'], chamber_ref)))
-                elif self.chamber_temp_coeff:
-                    val = ((env['chamber_temp'] - chamber_ref)
-                           * self.chamber_temp_coeff)
-                    total += val
+                        "global_%s_temp_poly" % (label,), val,
+                        "poly T=%.2f ref=%.2f" % (temp, ref)))
+                continue
+            coeff = getattr(self, coeff_attr)
+            if coeff:
+                val = (temp - ref) * coeff
+                total += val
+                if collect_details:
                     details.append((
-                        "global_chamber_temp", val,
-                        "(chamber %.2f - ref %.2f) * %.6f"
-                        % (env['chamber_temp'], chamber_ref,
-                           self.chamber_temp_coeff)))
+                        "global_%s_temp" % (label,), val,
+                        "(%s %.2f - ref %.2f) * %.6f"
+                        % (label, temp, ref, coeff)))
 
         # Global first layer compensation
+        layer_height = env.first_layer_height
         if (self.first_layer_coeff
-                and env['first_layer_height'] is not None
+                and layer_height is not None
                 and self.first_layer_reference is not None):
-            val = ((env['first_layer_height'] - self.first_layer_reference)
+            val = ((layer_height - self.first_layer_reference)
                    * self.first_layer_coeff)
             total += val
-            details.append((
-                "global_first_layer", val,
-                "(layer %.3f - ref %.3f) * %.6f"
-                % (env['first_layer_height'], self.first_layer_reference,
-                   self.first_layer_coeff)))
+            if collect_details:
+                details.append((
+                    "global_first_layer", val,
+                    "(layer %.3f - ref %.3f) * %.6f"
+                    % (layer_height, self.first_layer_reference,
+                       self.first_layer_coeff)))
 
         # Profile adjustments
         profiles = self._resolve_profiles(gcmd, env)
-        global_refs = self._global_refs()
         for profile in profiles:
-            pval, pdetails = profile.calculate(env, refs, global_refs)
+            pval, pdetails = profile.calculate(
+                env, merged_refs, collect_details)
             total += pval
-            details.append(
-                ("profile:%s" % (profile.name,), pval, "profile total"))
-            for d in pdetails:
-                note = d[2] if len(d) == 3 else ""
-                details.append((
-                    "profile:%s:%s" % (profile.name, d[0]),
-                    d[1], note))
+            if not collect_details:
+                continue
+            pfx = "profile:" + profile.name
+            details.append((pfx, pval, "profile total"))
+            if pdetails:
+                pfx += ":"
+                details.extend(
+                    (pfx + d[0], d[1], d[2] if len(d) == 3 else "")
+                    for d in pdetails)
 
         # EXTRA manual trim
         extra = gcmd.get_float('EXTRA', 0.)
         if extra:
             total += extra
-            details.append(("extra", extra, "gcode EXTRA"))
+            if collect_details:
+                details.append(("extra", extra, "gcode EXTRA"))
 
         # Max adjustment cap
         max_adjust = gcmd.get_float(
@@ -1422,6 +1713,13 @@ class AutoZTap:
     # ------------------------------------------------------------------
 
     def _validate_offset_safety(self, gcmd, final_offset):
+        # Common case: no per-command limits and the offset is in range
+        params = gcmd.get_command_parameters()
+        if ('SAFE_OFFSET_MIN' not in params
+                and 'SAFE_OFFSET_MAX' not in params
+                and self.safe_offset_min <= final_offset
+                <= self.safe_offset_max):
+            return
         min_safe = gcmd.get_float('SAFE_OFFSET_MIN', self.safe_offset_min)
         max_safe = gcmd.get_float('SAFE_OFFSET_MAX', self.safe_offset_max)
 
@@ -1460,6 +1758,7 @@ class AutoZTap:
     # ------------------------------------------------------------------
 
     def _summarize(self, result):
+        get = result.get
         lines = [
             "AUTO_Z_TAP applied (probe_type=%s):" % (self.probe_type,),
             "  reference_xy=%.3f,%.3f" % (
@@ -1471,29 +1770,31 @@ class AutoZTap:
             "  adjustment_total=%.4f final_offset=%.6f" % (
                 result['adjustment_total'], result['final_offset']),
         ]
-        if result.get('warmup_taps'):
-            lines.append("  warmup_taps=%d" % (result['warmup_taps'],))
-        if result.get('thermal_soak'):
-            lines.append("  thermal_soak=yes")
+        add = lines.append
+        warmup_taps = get('warmup_taps')
+        if warmup_taps:
+            add("  warmup_taps=%d" % (warmup_taps,))
+        if get('thermal_soak'):
+            add("  thermal_soak=yes")
         if result['profiles']:
-            lines.append("  profiles=%s" % (
+            add("  profiles=%s" % (
                 ','.join(result['profiles']),))
 
-        if self.report_breakdown and result.get('details'):
-            lines.append("  breakdown:")
-            for entry in result['details']:
+        details = get('details')
+        if self.report_breakdown and details:
+            add("  breakdown:")
+            for entry in details:
                 name, value = entry[0], entry[1]
                 note = entry[2] if len(entry) > 2 else ""
                 if note:
-                    lines.append(
-                        "    - %s: %.6f (%s)" % (name, value, note))
+                    add("    - %s: %.6f (%s)" % (name, value, note))
                 else:
-                    lines.append("    - %s: %.6f" % (name, value))
+                    add("    - %s: %.6f" % (name, value))
 
         if self.health_tracker:
             level, score = self.health_tracker.get_confidence()
             if level != 'unknown':
-                lines.append("  probe_confidence=%s (%.2f)" % (level, score))
+                add("  probe_confidence=%s (%.2f)" % (level, score))
 
         return '\n'.join(lines)
 
@@ -1501,43 +1802,48 @@ class AutoZTap:
     # Persistence
     # ------------------------------------------------------------------
 
-    def _persist_calibration(self):
-        self._save_variable(
-            self._var_key('calibrated'),
-            bool(self.status['calibrated']))
-        self._save_variable(
-            self._var_key('reference_probe_z'),
-            float(self.status['reference_probe_z']))
-        self._save_variable(
-            self._var_key('paper_delta'),
-            float(self.status['paper_delta']))
-        self._save_variable(
-            self._var_key('reference_x'),
-            float(self.status['reference_x']))
-        self._save_variable(
-            self._var_key('reference_y'),
-            float(self.status['reference_y']))
-        self._save_variable(
-            self._var_key('cal_probe_type'),
-            self.probe_type)
+    def _save_changed_variables(self, pairs):
+        # Skip values that are already stored; a save with nothing changed
+        # doesn't touch the variables file at all.
+        snapshot = self._read_saved_variables()
+        changed = {}
+        for key, value in pairs:
+            stored = snapshot.get(key, _MISSING)
+            if type(stored) is type(value) and stored == value:
+                continue
+            changed[key] = value
+        self._save_variables_bulk(changed)
 
+    def _persist_calibration(self):
+        st = self.status
+        vk = self._var_keys
+        pairs = [
+            (vk['calibrated'], bool(st['calibrated'])),
+            (vk['reference_probe_z'], float(st['reference_probe_z'])),
+            (vk['paper_delta'], float(st['paper_delta'])),
+            (vk['reference_x'], float(st['reference_x'])),
+            (vk['reference_y'], float(st['reference_y'])),
+            (vk['cal_probe_type'], self.probe_type),
+        ]
         for src, key in (
                 ('calibration_bed_temp', 'cal_bed_temp'),
                 ('calibration_hotend_temp', 'cal_hotend_temp'),
                 ('calibration_chamber_temp', 'cal_chamber_temp')):
-            val = self.status.get(src)
+            val = st.get(src)
             if val is not None:
-                self._save_variable(self._var_key(key), float(val))
+                pairs.append((vk[key], float(val)))
+        self._save_changed_variables(pairs)
 
     def _persist_last_run(self):
-        for src, key in (
-                ('last_probe_z', 'last_probe_z'),
-                ('last_probe_spread', 'last_probe_spread'),
-                ('last_offset', 'last_offset'),
-                ('last_drift', 'last_drift')):
-            val = self.status.get(src)
+        st = self.status
+        vk = self._var_keys
+        pairs = []
+        for key in ('last_probe_z', 'last_probe_spread', 'last_offset',
+                    'last_drift'):
+            val = st.get(key)
             if val is not None:
-                self._save_variable(self._var_key(key), float(val))
+                pairs.append((vk[key], float(val)))
+        self._save_changed_variables(pairs)
 
     # ------------------------------------------------------------------
     # Core flows
@@ -1616,7 +1922,11 @@ class AutoZTap:
         self.status['last_probe_spread'] = float(probe_spread)
         self.status['last_offset'] = float(final_offset)
         self.status['last_drift'] = float(drift)
-        self.status['last_profiles'] = [p.name for p in profiles]
+        profile_names = [p.name for p in profiles]
+        self.status['last_profiles'] = profile_names
+        self._status_dirty = True
+        # Not necessarily saved (SAVE=0 or a failed write)
+        self._loaded_variables = None
 
         # Persist
         save = gcmd.get_int(
@@ -1625,16 +1935,16 @@ class AutoZTap:
         if save:
             self._persist_last_run()
 
-        # Health tracking
+        # Health tracking.  Recording is cheap (the history write is
+        # already delayed); the health check and its warnings run from the
+        # reactor once this command has returned.
         if self.health_tracker:
             self.health_tracker.record_session(
                 probe_z, probe_spread, drift, samples,
                 retries_used or 0,
-                bed_temp=env.get('bed_temp'),
-                hotend_temp=env.get('hotend_temp'))
-            warnings = self.health_tracker.check_health()
-            for w in warnings:
-                self.gcode.respond_info("AUTO_Z_TAP WARNING: %s" % (w,))
+                bed_temp=env.bed_temp,
+                hotend_temp=env.hotend_temp)
+            self.reactor.register_callback(self._report_health_warnings)
 
         result = {
             'reference_x': x,
@@ -1648,13 +1958,19 @@ class AutoZTap:
             'estimated_paper_z': estimated_paper_z,
             'adjustment_total': adjustment,
             'final_offset': final_offset,
-            'profiles': [p.name for p in profiles],
+            'profiles': profile_names,
             'details': details,
             'warmup_taps': self.warmup_taps if did_warmup else 0,
             'thermal_soak': did_soak,
         }
         return result
 
+    def _report_health_warnings(self, eventtime):
+        if not self.health_tracker:
+            return
+        for w in self.health_tracker.check_health():
+            self.gcode.respond_info("AUTO_Z_TAP WARNING: %s" % (w,))
+
     def _start_calibration(self, gcmd):
         stage = "precheck"
         try:
@@ -1716,11 +2032,12 @@ class AutoZTap:
                 'retries_used': retries_used,
                 'samples': samples,
                 'command_params': command_params,
-                'calibration_bed_temp': env.get('bed_temp'),
-                'calibration_hotend_temp': env.get('hotend_temp'),
-                'calibration_chamber_temp': env.get('chamber_temp'),
+                'calibration_bed_temp': env.bed_temp,
+                'calibration_hotend_temp': env.hotend_temp,
+                'calibration_chamber_temp': env.chamber_temp,
             }
             self.status['calibration_in_progress'] = True
+            self._status_dirty = True
 
             stage = "start-manual-probe"
             self.gcode.respond_info(
@@ -1747,6 +2064,7 @@ class AutoZTap:
         pending = self.pending_calibration
         self.pending_calibration = None
         self.status['calibration_in_progress'] = False
+        self._status_dirty = True
 
         if pending is None:
             return
@@ -1774,6 +2092,8 @@ class AutoZTap:
             self.status['calibration_chamber_temp'] = (
                 pending['calibration_chamber_temp'])
             self.status['calibration_probe_type'] = self.probe_type
+            self._status_dirty = True
+            self._loaded_variables = None
 
             self._persist_calibration()
 
@@ -1839,20 +2159,21 @@ class AutoZTap:
         "paper calibration, then call AUTO_Z_TAP in START_PRINT.")
 
     def cmd_AUTO_Z_TAP(self, gcmd):
+        self._cmd_eventtime = self.reactor.monotonic()
         try:
             self._load_persistent_state()
+            params = gcmd.get_command_parameters()
 
-            if gcmd.get_int('CLEAR', 0, minval=0, maxval=1):
+            if self._get_flag(gcmd, params, 'CLEAR'):
                 self.cmd_AUTO_Z_TAP_CLEAR(gcmd)
                 return
 
-            if gcmd.get_int('CALIBRATE', 0, minval=0, maxval=1):
+            if self._get_flag(gcmd, params, 'CALIBRATE'):
                 self._start_calibration(gcmd)
                 return
 
             if (not self.status['calibrated']
-                    and gcmd.get_int('CALIBRATE_IF_NEEDED', 0,
-                                     minval=0, maxval=1)):
+                    and self._get_flag(gcmd, params, 'CALIBRATE_IF_NEEDED')):
                 self._start_calibration(gcmd)
                 return
 
@@ -1862,11 +2183,14 @@ class AutoZTap:
             raise
         except Exception as e:
             self._raise_internal_command_error(gcmd, "AUTO_Z_TAP", e)
+        finally:
+            self._cmd_eventtime = None
 
     cmd_AUTO_Z_TAP_CALIBRATE_help = (
         "Start interactive paper calibration for AUTO_Z_TAP")
 
     def cmd_AUTO_Z_TAP_CALIBRATE(self, gcmd):
+        self._cmd_eventtime = self.reactor.monotonic()
         try:
             self._load_persistent_state()
             self._start_calibration(gcmd)
@@ -1875,35 +2199,36 @@ class AutoZTap:
         except Exception as e:
             self._raise_internal_command_error(
                 gcmd, "AUTO_Z_TAP_CALIBRATE", e)
+        finally:
+            self._cmd_eventtime = None
 
     cmd_AUTO_Z_TAP_STATUS_help = (
         "Show AUTO_Z_TAP calibration, probe type, and health state")
 
     def cmd_AUTO_Z_TAP_STATUS(self, gcmd):
         self._load_persistent_state()
+        st = self.status
         lines = [
             "AUTO_Z_TAP status:",
             "  probe_type=%s (%s)" % (
                 self.probe_type, self.preset.get('description', '')),
-            "  calibrated=%s" % (self.status['calibrated'],),
+            "  calibrated=%s" % (st['calibrated'],),
             "  calibration_in_progress=%s" % (
-                self.status['calibration_in_progress'],),
+                st['calibration_in_progress'],),
             "  reference_xy=%.3f,%.3f" % (
-                self.status['reference_x'], self.status['reference_y']),
-            "  reference_probe_z=%.6f" % (
-                self.status['reference_probe_z'],),
-            "  paper_delta=%.6f" % (self.status['paper_delta'],),
+                st['reference_x'], st['reference_y']),
+            "  reference_probe_z=%.6f" % (st['reference_probe_z'],),
+            "  paper_delta=%.6f" % (st['paper_delta'],),
             "  calibration_temps bed=%s hotend=%s chamber=%s" % (
-                self.status['calibration_bed_temp'],
-                self.status['calibration_hotend_temp'],
-                self.status['calibration_chamber_temp']),
+                st['calibration_bed_temp'],
+                st['calibration_hotend_temp'],
+                st['calibration_chamber_temp']),
             "  calibration_probe_type=%s" % (
-                self.status.get('calibration_probe_type', 'unknown'),),
+                st.get('calibration_probe_type', 'unknown'),),
             "  last_probe_z=%s spread=%s drift=%s" % (
-                self.status['last_probe_z'],
-                self.status['last_probe_spread'],
-                self.status['last_drift']),
-            "  last_offset=%s" % (self.status['last_offset'],),
+                st['last_probe_z'], st['last_probe_spread'],
+                st['last_drift']),
+            "  last_offset=%s" % (st['last_offset'],),
             "  warmup_taps=%d thermal_soak=%s" % (
                 self.warmup_taps,
                 'enabled' if self.thermal_soak_enabled else 'disabled'),
@@ -1912,7 +2237,7 @@ class AutoZTap:
         ]
         if self.adjustments:
             lines.append("  available_profiles=%s" % (
-                ','.join(sorted(self.adjustments.keys())),))
+                ','.join(self._sorted_profile_names),))
 
         if self.health_tracker:
             stats = self.health_tracker.get_statistics()
@@ -1939,14 +2264,19 @@ class AutoZTap:
         self.status['last_probe_spread'] = None
         self.status['last_offset'] = None
         self.status['last_drift'] = None
-
-        self._save_variable(self._var_key('calibrated'), False)
-        self._save_variable(self._var_key('reference_probe_z'), 0.0)
-        self._save_variable(self._var_key('paper_delta'), 0.0)
-        self._save_variable(self._var_key('last_probe_z'), 0.0)
-        self._save_variable(self._var_key('last_probe_spread'), 0.0)
-        self._save_variable(self._var_key('last_offset'), 0.0)
-        self._save_variable(self._var_key('last_drift'), 0.0)
+        self._status_dirty = True
+        self._loaded_variables = None
+
+        vk = self._var_keys
+        self._save_variables_bulk({
+            vk['calibrated']: False,
+            vk['reference_probe_z']: 0.0,
+            vk['paper_delta']: 0.0,
+            vk['last_probe_z']: 0.0,
+            vk['last_probe_spread']: 0.0,
+            vk['last_offset']: 0.0,
+            vk['last_drift']: 0.0,
+        })
 
         clear_history = gcmd.get_int(
             'CLEAR_HISTORY', 0, minval=0, maxval=1)
@@ -1997,8 +2327,7 @@ class AutoZTap:
         warnings = self.health_tracker.check_health()
         if warnings:
             lines.append("  warnings:")
-            for w in warnings:
-                lines.append("    - %s" % (w,))
+            lines.extend(["    - %s" % (w,) for w in warnings])
 
         gcmd.respond_info('\n'.join(lines))
 
@@ -2019,25 +2348,22 @@ class AutoZTap:
             if warmup > 0:
                 self._run_warmup_taps(gcmd, x, y, warmup)
 
+            probe_speed = self._effective_probe_speed(gcmd)
+            lift_speed = self._effective_lift_speed(gcmd)
+            retract = self._effective_retract(gcmd)
+            params = self._build_probe_params(probe_speed, lift_speed, retract)
             self._move_to_reference(x, y)
             z_values = []
             for idx in range(samples):
-                pres = self._probe_once(gcmd)
+                pres = self._probe_with_params(params)
                 z_values.append(pres.bed_z)
                 if idx + 1 < samples:
                     cur = self.toolhead.get_position()
-                    self._manual_move(
-                        z=cur[2] + self._effective_retract(gcmd),
-                        speed=self._effective_lift_speed(gcmd))
+                    self._manual_move(z=cur[2] + retract, speed=lift_speed)
 
             self._raise_for_travel()
 
-            sorted_vals = sorted(z_values)
-            avg = sum(z_values) / len(z_values)
-            median = sorted_vals[len(sorted_vals) // 2]
-            spread = max(z_values) - min(z_values)
-            variance = sum((v - avg) ** 2 for v in z_values) / len(z_values)
-            stdev = math.sqrt(variance)
+            avg, median, spread, stdev = _sample_stats(z_values)
 
             if spread <= 0.005:
                 rating = "EXCELLENT"
@@ -2073,26 +2399,32 @@ class AutoZTap:
     # ------------------------------------------------------------------
 
     def get_status(self, eventtime):
-        status = dict(self.status)
-        status['probe_type'] = self.probe_type
-        status['probe_type_description'] = self.preset.get(
-            'description', '')
-        status['thermal_soak_enabled'] = self.thermal_soak_enabled
-        status['warmup_taps'] = self.warmup_taps
-        status['safe_offset_min'] = self.safe_offset_min
-        status['safe_offset_max'] = self.safe_offset_max
-
-        if self.health_tracker:
-            stats = self.health_tracker.get_statistics()
+        health = (self._health_status_fields()
+                  if self.health_tracker else None)
+        if self._status_dirty or health is not self._status_snapshot_health:
+            status = dict(self.status)
+            status.update(self._static_status)
+            if health:
+                status.update(health)
+            self._status_snapshot = status
+            self._status_snapshot_health = health
+            self._status_dirty = False
+        return self._status_snapshot
+
+    def _health_status_fields(self):
+        stats = self.health_tracker.get_statistics()
+        if stats is not self._health_status_stats:
+            self._health_status_stats = stats
+            fields = {}
             if stats:
                 level, score = self.health_tracker.get_confidence()
-                status['health_session_count'] = stats['session_count']
-                status['health_avg_spread'] = stats['avg_spread']
-                status['health_confidence'] = level
-                status['health_confidence_score'] = score
-                status['health_trend'] = stats['recent_trend']
-
-        return status
+                fields['health_session_count'] = stats['session_count']
+                fields['health_avg_spread'] = stats['avg_spread']
+                fields['health_confidence'] = level
+                fields['health_confidence_score'] = score
+                fields['health_trend'] = stats['recent_trend']
+            self._health_status = fields
+        return self._health_status
 
 
 def load_config(config):